@@ -6,6 +6,19 @@ from torch import nn
 from torch.nn import functional as F
 
 
+class FusedLinearAct(nn.Linear):
+    def __init__(self, in_features: int, out_features: int, act: Type[nn.Module], **kwargs):
+        """
+        A Linear layer followed by an activation, run in a single module call.
+        Subclasses nn.Linear so parameter names and initialization code are unchanged.
+        """
+        super().__init__(in_features, out_features, **kwargs)
+        self.act = act()
+
+    def forward(self, input: torch.Tensor) -> torch.Tensor:
+        return self.act(F.linear(input, self.weight, self.bias))
+
+
 class MLP(nn.Module):
     def __init__(
         self,
@@ -20,7 +33,14 @@ class MLP(nn.Module):
         super().__init__()
         net = []
         last_dim = input_dim
+        # Without anything between the linear layers and activations we can fuse them
+        # to cut the number of module calls per forward pass in half.
+        self._fused = dropout == 0.0 and normalization is None
         for dim in hidden_layers:
+            if self._fused:
+                net.append(FusedLinearAct(last_dim, dim, act))
+                last_dim = dim
+                continue
             net.append(nn.Linear(last_dim, dim))
             if dropout > 0.0:
                 net.append(nn.Dropout(dropout))
@@ -28,15 +48,32 @@ class MLP(nn.Module):
                 net.append(normalization(dim))
             net.append(act())
             last_dim = dim
-        net.append(nn.Linear(last_dim, output_dim))
-        if output_act is not None:
-            net.append(output_act())
+        if self._fused and output_act is not None:
+            net.append(FusedLinearAct(last_dim, output_dim, output_act))
+        else:
+            net.append(nn.Linear(last_dim, output_dim))
+            if output_act is not None:
+                net.append(output_act())
         self.net = nn.Sequential(*net)
         self._has_output_act = False if output_act is None else True
+        if self._fused:
+            self._num_hidden_layers = len(hidden_layers)
+            self._register_load_state_dict_pre_hook(self._remap_unfused_state_dict)
+
+    def _remap_unfused_state_dict(self, state_dict, prefix, *args) -> None:
+        # Checkpoints saved before fusing store the linear layers at every other index of net.
+        # Linear layer i used to live at net.{2i}, and now lives at net.{i}.
+        if prefix + "net.{}.weight".format(2 * self._num_hidden_layers) not in state_dict:
+            return
+        for i in range(1, self._num_hidden_layers + 1):
+            for name in ("weight", "bias"):
+                old_key = prefix + "net.{}.{}".format(2 * i, name)
+                if old_key in state_dict:
+                    state_dict[prefix + "net.{}.{}".format(i, name)] = state_dict.pop(old_key)
 
     @property
     def last_layer(self) -> nn.Module:
-        if self._has_output_act:
+        if self._has_output_act and not self._fused:
             return self.net[-2]
         else:
             return self.net[-1]
@@ -65,36 +102,38 @@ class LinearEnsemble(nn.Module):
         self.in_features = in_features
         self.out_features = out_features
         self.ensemble_size = ensemble_size
-        self.weight = torch.empty(
-            (ensemble_size, in_features, out_features), **factory_kwargs
+        self.weight = nn.Parameter(
+            torch.empty((ensemble_size, in_features, out_features), **factory_kwargs)
         )
         if bias:
-            self.bias = torch.empty((ensemble_size, 1, out_features), **factory_kwargs)
+            self.bias = nn.Parameter(
+                torch.empty((ensemble_size, 1, out_features), **factory_kwargs)
+            )
         else:
             self.register_parameter("bias", None)
         self.reset_parameters()
 
     def reset_parameters(self) -> None:
-        # Hack to make sure initialization is correct. This shouldn't be too bad though
-        for w in self.weight:
-            w.transpose_(0, 1)
-            nn.init.kaiming_uniform_(w, a=math.sqrt(5))
-            w.transpose_(0, 1)
-        self.weight = nn.Parameter(self.weight)
-
+        # Matches nn.Linear: kaiming_uniform_ with a=sqrt(5) reduces to U(-1/sqrt(fan_in), 1/sqrt(fan_in)).
+        # Since entries are iid we can initialize all members at once without transposing to (O, I).
+        bound = 1 / math.sqrt(self.in_features) if self.in_features > 0 else 0
+        nn.init.uniform_(self.weight, -bound, bound)
         if self.bias is not None:
-            fan_in, _ = nn.init._calculate_fan_in_and_fan_out(self.weight[0].T)
-            bound = 1 / math.sqrt(fan_in)
             nn.init.uniform_(self.bias, -bound, bound)
-            self.bias = nn.Parameter(self.bias)
 
     def forward(self, input: torch.Tensor) -> torch.Tensor:
         if len(input.shape) == 2:
-            input = input.repeat(self.ensemble_size, 1, 1)
+            # Broadcast the shared input against every member instead of repeating it E times.
+            # (B, I) @ (E, I, O) -> (E, B, O) runs as a single strided batched GEMM.
+            output = torch.matmul(input, self.weight)
+            return output if self.bias is None else output + self.bias
         elif len(input.shape) > 3:
             raise ValueError(
                 "LinearEnsemble layer does not support inputs with more than 3 dimensions."
             )
+        input = input.contiguous()
+        if self.bias is None:
+            return torch.bmm(input, self.weight)
         return torch.baddbmm(self.bias, input, self.weight)
 
     def extra_repr(self) -> str:
@@ -106,17 +145,58 @@ class LinearEnsemble(nn.Module):
         )
 
 
-class EnsemblePermuter(nn.Module):
-    def __init__(self, layer_class, *layer_args, **layer_kwargs):
+class EnsembleLayerNorm(nn.Module):
+    def __init__(
+        self,
+        ensemble_size: int,
+        normalized_shape: int,
+        eps: float = 1e-5,
+        device: Optional[Union[str, torch.device]] = None,
+        dtype: Optional[torch.dtype] = None,
+    ):
+        """
+        A LayerNorm over the last dim of (E, B, H) inputs with a separate affine transform per member.
+        Operates directly on the ensemble layout, so no transposes are needed.
+        """
+        factory_kwargs = {"device": device, "dtype": dtype}
         super().__init__()
-        self.layer = layer_class(*layer_args, **layer_kwargs)
+        self.ensemble_size = ensemble_size
+        self.normalized_shape = (normalized_shape,)
+        self.eps = eps
+        self.weight = nn.Parameter(
+            torch.ones((ensemble_size, 1, normalized_shape), **factory_kwargs)
+        )
+        self.bias = nn.Parameter(
+            torch.zeros((ensemble_size, 1, normalized_shape), **factory_kwargs)
+        )
+        self._register_load_state_dict_pre_hook(self._remap_permuted_state_dict)
 
-    def forward(self, x):
-        # permute the dimensions so it is (B, E, ...) instead of (E, B, ...)
-        x = x.transpose(0, 1)
-        x = self.layer(x)
-        x = x.transpose(0, 1)
-        return x
+    def _remap_permuted_state_dict(self, state_dict, prefix, *args) -> None:
+        # Checkpoints saved with EnsemblePermuter(nn.LayerNorm, (E, H)) store the affine parameters
+        # as layer.weight and layer.bias of shape (E, H). Their layout maps onto (E, 1, H), but they were
+        # trained against statistics pooled over (E, H), so the outputs of the loaded model will differ.
+        remapped = False
+        for name in ("weight", "bias"):
+            old_key = prefix + "layer." + name
+            if old_key in state_dict:
+                state_dict[prefix + name] = state_dict.pop(old_key).unsqueeze(1)
+                remapped = True
+        if remapped:
+            print(
+                "[research] Warning: Loading an EnsemblePermuter LayerNorm checkpoint into EnsembleLayerNorm at",
+                prefix,
+                "Normalization is now per member, so outputs will not match the original model.",
+            )
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        return torch.addcmul(
+            self.bias, self.weight, F.layer_norm(x, self.normalized_shape, eps=self.eps)
+        )
+
+    def extra_repr(self) -> str:
+        return "ensemble_size={}, normalized_shape={}, eps={}".format(
+            self.ensemble_size, self.normalized_shape, self.eps
+        )
 
 
 class EnsembleMLP(nn.Module):
@@ -130,10 +210,13 @@ class EnsembleMLP(nn.Module):
         dropout: float = 0.0,
         normalization: Optional[Type[nn.Module]] = None,
         output_act: Optional[Type[nn.Module]] = None,
+        compile: bool = False,
     ):
         """
         An ensemble MLP
         Returns values of shape (E, B, H) from input (B, H)
+        If compile is True, the forward pass is compiled with torch.compile so that the
+        bias add, normalization and activation of each layer can be fused.
         """
         super().__init__()
         # Change the normalization type to work over ensembles
@@ -147,7 +230,7 @@ class EnsembleMLP(nn.Module):
             if dropout > 0.0:
                 net.append(nn.Dropout(dropout))
             if normalization is not None:
-                net.append(EnsemblePermuter(normalization, (ensemble_size, dim)))
+                net.append(EnsembleLayerNorm(ensemble_size, dim))
             net.append(act())
             last_dim = dim
         net.append(LinearEnsemble(last_dim, output_dim, ensemble_size=ensemble_size))
@@ -155,8 +238,17 @@ class EnsembleMLP(nn.Module):
             net.append(output_act())
         self.net = nn.Sequential(*net)
         self._has_output_act = False if output_act is None else True
+        if compile:
+            assert hasattr(torch, "compile"), "EnsembleMLP compile requires torch >= 2.0"
+            # Compile the bound forward rather than the module so parameters are not re-registered
+            # and indexing into self.net (e.g. last_layer) still works.
+            self._compiled_forward = torch.compile(self.net.forward)
+        else:
+            self._compiled_forward = None
 
     def forward(self, x: torch.Tensor) -> torch.Tensor:
+        if self._compiled_forward is not None:
+            return self._compiled_forward(x)
         return self.net(x)
 
     @property
@@ -64,8 +64,10 @@ class ContinuousMLPCritic(nn.Module):
         ensemble_size: int = 2,
         ortho_init: bool = False,
         output_gain: Optional[float] = None,
+        compile: bool = False,
     ):
         super().__init__()
+        assert not compile or ensemble_size > 1, "compile is only supported for ensemble critics"
         self.ensemble_size = ensemble_size
         if self.ensemble_size > 1:
             self.q = EnsembleMLP(
@@ -76,6 +78,7 @@ class ContinuousMLPCritic(nn.Module):
                 act=act,
                 dropout=dropout,
                 normalization=normalization,
+                compile=compile,
             )
         else:
             self.q = MLP(
@@ -314,6 +317,7 @@ class RewardMLPEnsemble(nn.Module):
         act=nn.LeakyReLU,
         ensemble_size=3,
         output_act=nn.Tanh,
+        compile=False,
     ):
         super().__init__()
         self.net = EnsembleMLP(
@@ -323,6 +327,7 @@ class RewardMLPEnsemble(nn.Module):
             hidden_layers=hidden_layers,
             act=act,
             output_act=output_act,
+            compile=compile,
         )
 
     def forward(self, obs, action):
@@ -350,16 +355,11 @@ class MetaRewardMLPEnsemble(nn.Module):
                 1,
             ]
         ):
-            weight = torch.empty(ensemble_size, last_dim, dim)
-            for w in weight:
-                w.transpose_(0, 1)
-                nn.init.kaiming_uniform_(w, a=math.sqrt(5))
-                w.transpose_(0, 1)
-            params[f"linear_w_{i}"] = nn.Parameter(weight)
-            fan_in, _ = nn.init._calculate_fan_in_and_fan_out(
-                params[f"linear_w_{i}"][0].T
+            # Same init as LinearEnsemble.reset_parameters, done for all members at once
+            bound = 1 / math.sqrt(last_dim) if last_dim > 0 else 0
+            params[f"linear_w_{i}"] = nn.Parameter(
+                nn.init.uniform_(torch.empty(ensemble_size, last_dim, dim), -bound, bound)
             )
-            bound = 1 / math.sqrt(fan_in) if fan_in > 0 else 0
             params[f"linear_b_{i}"] = nn.Parameter(
                 nn.init.uniform_(
                     torch.empty(ensemble_size, 1, dim, requires_grad=True),
@@ -1,5 +1,7 @@
 import copy
 import importlib
+import itertools
+import json
 import os
 import pprint
 from typing import Any, Dict
@@ -96,6 +98,17 @@ class Config(object):
         config.update(data)
         return config
 
+    @classmethod
+    def load_from_jsonl(cls, path: str, index: int) -> "Config":
+        """Loads the config stored on line `index` of a JSON lines sweep file written by tools/utils.py"""
+        with open(path, "r") as f:
+            line = next(itertools.islice(f, index, None), None)
+        if line is None:
+            raise ValueError("Sweep file " + path + " has no config at index " + str(index))
+        config = cls()
+        config.update(json.loads(line)["config"])
+        return config
+
     def flatten(self) -> Dict:
         """Returns a flattened version of the config where '.' separates nested values"""
         return flatten_dict(self.config)
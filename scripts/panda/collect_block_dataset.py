@@ -1,62 +1,131 @@
 import argparse
 import os
-from typing import List
+from functools import partial
+from typing import Callable, Dict, List, Optional
 
 import gym
 import numpy as np
+import torch
 
 import research
 from research.algs.base import Algorithm
 from research.datasets import ReplayBuffer
 from research.utils.config import Config
-from research.utils.trainer import load, load_from_path
-
-
-def collect_random_episode(env: gym.Env, dataset: ReplayBuffer) -> None:
-    obs = env.reset()
-    dataset.add(obs)
-    episode_length = 0
-    done = False
-    while not done:
-        action = env.action_space.sample()
-        obs, reward, done, info = env.step(action)
-        episode_length += 1
-        if "discount" in info:
-            discount = info["discount"]
-        elif (
-            hasattr(env, "_max_episode_steps")
-            and episode_length == env._max_episode_steps
-        ):
-            discount = 1.0
-        else:
-            discount = 1 - float(done)
-        dataset.add(obs, action, reward, done, discount)
-
-
-def collect_policy_episode(
-    env: gym.Env, model: Algorithm, dataset: ReplayBuffer, noise: float = 0.1
-):
-    obs = env.reset()
-    dataset.add(obs)
-    episode_length = 0
-    done = False
-    success_count = 0
-    while not done and success_count < 15:
-        action = model.predict(obs)
-        action = action + noise * np.random.randn(*action.shape)
-        obs, reward, done, info = env.step(action)
-        episode_length += 1
-        success_count += int(info["success"])
-        if "discount" in info:
-            discount = info["discount"]
-        elif (
-            hasattr(env, "_max_episode_steps")
-            and episode_length == env._max_episode_steps
-        ):
-            discount = 1.0
-        else:
-            discount = 1 - float(done)
-        dataset.add(obs, action, reward, done, discount)
+from research.utils.trainer import get_env, load, load_from_path
+
+
+def get_discount(
+    info: Dict, episode_length: int, max_episode_steps: Optional[int], done: bool
+) -> float:
+    if "discount" in info:
+        return info["discount"]
+    elif max_episode_steps is not None and episode_length == max_episode_steps:
+        return 1.0
+    else:
+        return 1 - float(done)
+
+
+def make_seeded_env(env_fn: Callable[[], gym.Env], seed: int) -> gym.Env:
+    # The envs draw from the global np.random, which forked vector env workers would otherwise share.
+    np.random.seed(seed)
+    return env_fn()
+
+
+def collect_episodes(
+    env: gym.vector.VectorEnv,
+    dataset: ReplayBuffer,
+    num_ep: int,
+    get_action: Callable[[np.ndarray], np.ndarray],
+    max_episode_steps: Optional[int] = None,
+    max_success: Optional[int] = None,
+) -> None:
+    """
+    Collects num_ep episodes, running up to env.num_envs of them in lockstep.
+    Sub-envs that finish are masked out until the whole round is done. Episodes are
+    buffered per sub-env and written to the dataset one after another so they stay contiguous.
+    """
+    num_envs = env.num_envs
+    while num_ep > 0:
+        num_active = min(num_ep, num_envs)
+        num_ep -= num_active
+        active = np.arange(num_envs) < num_active
+        success_count = np.zeros(num_envs, dtype=np.int64)
+        obs = env.reset()
+        # Each episode starts with the initial obs and a dummy transition, following the ReplayBuffer format
+        episodes = [
+            [(obs[i], dataset.dummy_action, 0.0, False, 1.0)] for i in range(num_active)
+        ]
+        episode_length = 0
+        while active.any():
+            action = get_action(obs)
+            obs, reward, done, info = env.step(action)
+            episode_length += 1
+            for i in np.flatnonzero(active):
+                # Vector envs reset finished sub-envs automatically, so the last obs lives in the info
+                next_obs = info[i]["terminal_observation"] if done[i] else obs[i]
+                discount = get_discount(info[i], episode_length, max_episode_steps, done[i])
+                episodes[i].append((next_obs, action[i], reward[i], done[i], discount))
+                if max_success is not None:
+                    success_count[i] += int(info[i]["success"])
+                if done[i] or (max_success is not None and success_count[i] >= max_success):
+                    active[i] = False
+        for episode in episodes:
+            # Add each episode in a single batched call instead of once per transition
+            ep_obs, ep_action, ep_reward, ep_done, ep_discount = zip(*episode)
+            dataset.add(
+                np.stack(ep_obs),
+                np.stack(ep_action),
+                np.array(ep_reward, dtype=np.float32),
+                np.array(ep_done, dtype=np.bool_),
+                np.array(ep_discount, dtype=np.float32),
+            )
+
+
+def collect_random_episodes(
+    env: gym.vector.VectorEnv,
+    dataset: ReplayBuffer,
+    num_ep: int,
+    max_episode_steps: Optional[int] = None,
+) -> None:
+    collect_episodes(
+        env,
+        dataset,
+        num_ep,
+        lambda obs: env.action_space.sample(),
+        max_episode_steps=max_episode_steps,
+    )
+
+
+def collect_policy_episodes(
+    env: gym.vector.VectorEnv,
+    model: Algorithm,
+    dataset: ReplayBuffer,
+    num_ep: int,
+    noise: float = 0.1,
+    max_episode_steps: Optional[int] = None,
+    bf16: bool = False,
+) -> None:
+    def get_action(obs: np.ndarray) -> np.ndarray:
+        # Pass a tensor so predict returns one on the model's device, and upcast it in case it was
+        # computed in bf16. The exploration noise is then drawn and added on that device too.
+        action = model.predict(dict(obs=torch.as_tensor(obs)), is_batched=True).float()
+        if noise > 0.0:
+            action = torch.add(action, torch.randn_like(action), alpha=noise)
+        return action.cpu().numpy()
+
+    # bf16 autocast is only worth it on GPU. On CPU we keep the rollout in fp32.
+    use_bf16 = bf16 and model.device.type == "cuda"
+    with torch.inference_mode(), torch.autocast(
+        model.device.type, dtype=torch.bfloat16, enabled=use_bf16
+    ):
+        collect_episodes(
+            env,
+            dataset,
+            num_ep,
+            get_action,
+            max_episode_steps=max_episode_steps,
+            max_success=15,
+        )
 
 
 def collect_dataset(
@@ -68,6 +137,8 @@ def collect_dataset(
     cross_ep: int = 1,
     init_noise: float = 0.0,
     policy_noise: float = 0.0,
+    num_envs: int = 8,
+    bf16: bool = False,
 ) -> None:
     config = Config.load(task_path)
     config["env_kwargs"]["initialization_noise"] = init_noise
@@ -76,12 +147,33 @@ def collect_dataset(
     )
     del expert_model.eval_env
     env = expert_model.env
+    max_episode_steps = getattr(env, "_max_episode_steps", None)
     dataset = ReplayBuffer(
         env.observation_space, env.action_space, capacity=1000000, distributed=False
     )  # hardcode to 1 mil max transitions
     dataset.setup()
-    for _ in range(random_ep):
-        collect_random_episode(env, dataset)
+
+    # Rounds never have more active sub-envs than episodes per call, so don't spawn more than that.
+    num_envs = max(1, min(num_envs, max(random_ep, expert_ep, cross_ep)))
+    if num_envs == 1:
+        # Nothing to parallelize, so step the already constructed env in process.
+        vec_env = gym.vector.SyncVectorEnv([lambda: env])
+    else:
+        parsed_config = config.parse()
+        env_fn = partial(
+            get_env,
+            parsed_config["env"],
+            parsed_config["env_kwargs"],
+            parsed_config["wrapper"],
+            parsed_config["wrapper_kwargs"],
+        )
+        base_seed = np.random.randint(2**31 - num_envs)
+        vec_env = gym.vector.AsyncVectorEnv(
+            [partial(make_seeded_env, env_fn, base_seed + i) for i in range(num_envs)]
+        )
+    collect_random_episodes(
+        vec_env, dataset, random_ep, max_episode_steps=max_episode_steps
+    )
 
     used_expert = False
     for policy_path in policy_paths:
@@ -96,8 +188,16 @@ def collect_dataset(
             del current_model.env
             del current_model.eval_env
             num_ep = cross_ep
-        for _ in range(num_ep):
-            collect_policy_episode(env, current_model, dataset, noise=policy_noise)
+        collect_policy_episodes(
+            vec_env,
+            current_model,
+            dataset,
+            num_ep,
+            noise=policy_noise,
+            max_episode_steps=max_episode_steps,
+            bf16=bf16,
+        )
+    vec_env.close()
     assert used_expert, "Must have used expert policy"
 
     # save the dataset
@@ -115,6 +215,12 @@ if __name__ == "__main__":
     parser.add_argument("--policy-noise", type=float, default=0.1)
     parser.add_argument("--path", "-p", type=str, required=True, help="output path")
     parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument(
+        "--num-envs", type=int, default=8, help="number of envs to roll out in parallel"
+    )
+    parser.add_argument(
+        "--bf16", action="store_true", default=False, help="run policies in bf16 on GPU"
+    )
 
     args = parser.parse_args()
 
@@ -127,4 +233,15 @@ if __name__ == "__main__":
         task_paths = [policy_paths[args.seed]]
 
     for task in task_paths:
-        collect_dataset(task, policy_paths, args.path)
+        collect_dataset(
+            task,
+            policy_paths,
+            args.path,
+            random_ep=args.random_ep,
+            expert_ep=args.expert_ep,
+            cross_ep=args.cross_ep,
+            init_noise=args.init_noise,
+            policy_noise=args.policy_noise,
+            num_envs=args.num_envs,
+            bf16=args.bf16,
+        )
@@ -5,9 +5,18 @@ from research.utils.trainer import Config, train
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--config", "-c", type=str, default=None)
+    parser.add_argument(
+        "--config-index",
+        type=int,
+        default=None,
+        help="line of a .jsonl sweep file to read the config from",
+    )
     parser.add_argument("--path", "-p", type=str, default=None)
     parser.add_argument("--device", "-d", type=str, default="auto")
     args = parser.parse_args()
 
-    config = Config.load(args.config)
+    if args.config_index is None:
+        config = Config.load(args.config)
+    else:
+        config = Config.load_from_jsonl(args.config, args.config_index)
     train(config, args.path, device=args.device)
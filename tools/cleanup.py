@@ -16,7 +16,7 @@ if __name__ == "__main__":
             if name.startswith("job_"):
                 os.remove(path)
                 job_scripts_removed += 1
-            elif name.startswith("config_"):
+            elif name.startswith("config_") or name.startswith("sweep_"):
                 os.remove(path)
                 sweeper_configs_removed += 1
             elif name.startswith("replay_buffer_"):
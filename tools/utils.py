@@ -1,14 +1,23 @@
 import argparse
 import copy
+import functools
 import itertools
 import json
 import os
+import pickle
 import pprint
 import tempfile
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
 import yaml
 
+try:
+    from yaml import CSafeDumper as Dumper
+    from yaml import CSafeLoader as Loader
+except ImportError:
+    from yaml import SafeDumper as Dumper
+    from yaml import SafeLoader as Loader
+
 # Global configuration values for default output and storage.
 repo_path = os.path.dirname(os.path.dirname(__file__))
 STORAGE_ROOT = os.path.dirname(repo_path)
@@ -22,6 +31,16 @@ DEFAULT_REQUIRED_ARGS = ["path", "config"]
 FOLDER_KEYS = ["env"]
 
 
+@functools.lru_cache(maxsize=64)
+def _load_yaml(path: str, mtime: int) -> Any:
+    """
+    Cached YAML load keyed on the absolute path and modification time, so an edited file is re-read.
+    The returned object is shared between calls and must not be modified.
+    """
+    with open(path, "r") as f:
+        return yaml.load(f, Loader=Loader)
+
+
 def get_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser()
     parser.add_argument("--entry-point", type=str, action="append", default=None)
@@ -85,14 +104,18 @@ def get_scripts(args: argparse.Namespace) -> List[Tuple[str, Dict]]:
 
             if script_args["config"].endswith(".json"):
                 experiment = Experiment.load(script_args["config"])
-                configs_and_paths = [
-                    (c, os.path.join(script_args["path"], n))
-                    for c, n in experiment.generate_configs_and_names()
+                # All variants share one sweep file, and each script reads its own line of it.
+                scripts = [
+                    {
+                        "config": c,
+                        "config-index": i,
+                        "path": os.path.join(script_args["path"], n),
+                    }
+                    for c, i, n in experiment.generate_configs_and_names()
                 ]
             else:
-                configs_and_paths = [(script_args["config"], script_args["path"])]
+                scripts = [{"config": script_args["config"], "path": script_args["path"]}]
 
-            scripts = [{"config": c, "path": p} for c, p in configs_and_paths]
             for arg_name in script_args.keys():
                 if arg_name not in scripts[0]:
                     print(
@@ -109,18 +132,13 @@ def get_scripts(args: argparse.Namespace) -> List[Tuple[str, Dict]]:
             scripts = [script_args]
 
         if args.seeds_per_script > 1:
-            # copy all of the configratuions and add seeds
-            seeded_scripts = []
-            for script in scripts:
-                seed = int(script.get("seed"))
-                for i in range(args.seeds_per_script):
-                    seeded_script = (
-                        script.copy()
-                    )  # Should be a shallow dictionary, so copy OK
-                    seeded_script["seed"] = seed + i
-                    seeded_scripts.append(seeded_script)
+            # copy all of the configratuions and add seeds. Scripts are shallow dicts, so merging is OK.
             # Replace regular jobs with the seeded variants.
-            scripts = seeded_scripts
+            scripts = [
+                {**script, "seed": int(script.get("seed")) + i}
+                for script in scripts
+                for i in range(args.seeds_per_script)
+            ]
 
         # add the entry point
         scripts = [(entry_point, script_args) for script_args in scripts]
@@ -145,7 +163,7 @@ class Config(object):
         if os.path.isdir(path):
             path = os.path.join(path, "config.yaml")
         with open(path, "w") as f:
-            yaml.dump(self.config, f)
+            yaml.dump(self.config, f, Dumper=Dumper)
 
     def update(self, d: Dict) -> None:
         self.config.update(d)
@@ -154,8 +172,8 @@ class Config(object):
     def load(cls, path: str) -> "Config":
         if os.path.isdir(path):
             path = os.path.join(path, "config.yaml")
-        with open(path, "r") as f:
-            data = yaml.load(f, Loader=yaml.Loader)
+        path = os.path.abspath(path)
+        data = copy.deepcopy(_load_yaml(path, os.stat(path).st_mtime_ns))
         config = cls()
         config.update(data)
         return config
@@ -219,7 +237,11 @@ class Experiment(dict):
         experiment.update(data)
         return experiment
 
-    def get_variants(self) -> List:
+    def get_variants(self) -> Iterator[Dict]:
+        """
+        Lazily yields every variant of the experiment as a dict from key to value.
+        Unpaired keys are swept over with a product, paired keys are zipped together.
+        """
         paired_keys = set()
         for key_pair in self.paired_keys:
             for k in key_pair:
@@ -227,35 +249,24 @@ class Experiment(dict):
                     raise ValueError("Key was paired multiple times!")
                 paired_keys.add(k)
 
-        groups = []
         unpaired_keys = [
             key for key in self.keys() if key not in paired_keys
         ]  # Fix the ordering!
-        unpaired_variants = itertools.product(*[self[k] for k in unpaired_keys])
-        unpaired_variants = [
-            {key: variant[i] for i, key in enumerate(unpaired_keys)}
-            for variant in unpaired_variants
-        ]
-        groups.append(unpaired_variants)
-
-        # Now construct the paired variants
+        # Each unpaired key is its own group, while each key pair forms one group of zipped values.
+        key_groups = [(k,) for k in unpaired_keys]
+        value_groups = [[(v,) for v in self[k]] for k in unpaired_keys]
         for key_pair in self.paired_keys:
             # instead of using product, use zip
-            pair_variant = zip(*[self[k] for k in key_pair])  # This gets all the values
-            pair_variant = [
-                {key: variant[i] for i, key in enumerate(key_pair)}
-                for variant in pair_variant
-            ]
-            groups.append(pair_variant)
+            key_groups.append(tuple(key_pair))
+            value_groups.append(list(zip(*[self[k] for k in key_pair])))
 
-        group_variants = itertools.product(*groups)
-        # Collapse the variants, making sure to copy the dictionaries so we don't get duplicates
-        variants = []
-        for variant in group_variants:
-            collapsed_variant = {k: v for x in variant for k, v in x.items()}
-            variants.append(collapsed_variant)
-
-        return variants
+        # Stream the product instead of materializing every variant up front.
+        for variant in itertools.product(*value_groups):
+            yield {
+                k: v
+                for keys, values in zip(key_groups, variant)
+                for k, v in zip(keys, values)
+            }
 
     @staticmethod
     def format_name(v: Any):
@@ -277,56 +288,67 @@ class Experiment(dict):
             raise ValueError("Could not convert config value to str.")
         return str_val
 
-    def generate_configs_and_names(self) -> List[Tuple[str, str]]:
+    def generate_configs_and_names(self) -> List[Tuple[str, int, str]]:
+        """
+        Writes the config of every variant as one line of a single JSON lines sweep file.
+        Returns (sweep file path, line index, name) for each variant.
+        """
         variants = self.get_variants()
         configs_and_names = []
-        for i, variant in enumerate(variants):
-            config = self.base_config.copy()
-            name = ""
-            seed = None
-            remove_trailing_underscore = False
-            for k, v in variant.items():
-                config_path = k.split(".")
-                config_dict = config
-                # Recursively update the current config until we find the value.
-                while len(config_path) > 1:
-                    if not config_path[0] in config_dict:
+        if not os.path.exists(TMP_DIR):
+            os.mkdir(TMP_DIR)
+        fd, sweep_path = tempfile.mkstemp(
+            text=True, prefix="sweep_", suffix=".jsonl", dir=TMP_DIR
+        )
+        # Serialize the base config once. A pickle round trip is much cheaper than a deepcopy per variant.
+        base_config = pickle.dumps(self.base_config.config, protocol=pickle.HIGHEST_PROTOCOL)
+        # Everything about a key except its value is the same across variants, so compute it once.
+        key_info = {
+            k: (k.split("."), k in FOLDER_KEYS, len(self[k]) > 1, k == "seed")
+            for k in self.keys()
+        }
+        # Write every variant to one file as it is built instead of one small file per variant.
+        with os.fdopen(fd, "w") as f:
+            for i, variant in enumerate(variants):
+                config = Config()
+                config.config = pickle.loads(base_config)
+                name = ""
+                seed = None
+                remove_trailing_underscore = False
+                for k, v in variant.items():
+                    config_path, is_folder, is_multi, is_seed = key_info[k]
+                    config_dict = config.config
+                    # Recursively update the current config until we find the value.
+                    for config_key in config_path[:-1]:
+                        if config_key not in config_dict:
+                            raise ValueError(
+                                "Experiment specified key not in config: " + str(k)
+                            )
+                        config_dict = config_dict[config_key]
+                    if not config_path[-1] in config_dict:
                         raise ValueError(
                             "Experiment specified key not in config: " + str(k)
                         )
-                    config_dict = config_dict[config_path[0]]
-                    config_path.pop(0)
-                if not config_path[0] in config_dict:
-                    raise ValueError(
-                        "Experiment specified key not in config: " + str(k)
-                    )
-                # Finally set the value
-                config_dict[config_path[0]] = v
-
-                if k in FOLDER_KEYS and len(self[k]) > 1:
-                    name = os.path.join(v, name)
-                elif (
-                    k == "seed" and len(self["seed"]) > 1
-                ):  # More than one seed specified.
-                    seed = v  # Note that seed is not added to the name.
-                elif len(self[k]) > 1:
-                    str_val = Experiment.format_name(v)
-                    name += str(config_path[0]) + "-" + str_val + "_"
-                    remove_trailing_underscore = True
-
-            if remove_trailing_underscore:
-                name = name[:-1]
-            name = os.path.join(self.name, name)
-            if seed is not None:
-                name = os.path.join(name, "seed-" + str(seed))
-            if not os.path.exists(TMP_DIR):
-                os.mkdir(TMP_DIR)
-            _, config_path = tempfile.mkstemp(
-                text=True, prefix="config_", suffix=".json", dir=TMP_DIR
-            )
-            print("Variant", i + 1)
-            print(config)
-            config.save(config_path)
-            configs_and_names.append((config_path, name))
+                    # Finally set the value
+                    config_dict[config_path[-1]] = v
+
+                    if is_folder and is_multi:
+                        name = os.path.join(v, name)
+                    elif is_seed and is_multi:  # More than one seed specified.
+                        seed = v  # Note that seed is not added to the name.
+                    elif is_multi:
+                        str_val = Experiment.format_name(v)
+                        name += str(config_path[-1]) + "-" + str_val + "_"
+                        remove_trailing_underscore = True
+
+                if remove_trailing_underscore:
+                    name = name[:-1]
+                name = os.path.join(self.name, name)
+                if seed is not None:
+                    name = os.path.join(name, "seed-" + str(seed))
+                print("Variant", i + 1)
+                print(config)
+                f.write(json.dumps({"name": name, "config": config.config}) + "\n")
+                configs_and_names.append((sweep_path, i, name))
 
         return configs_and_names